@@ -1,5 +1,13 @@
+from bs4 import SoupStrainer
+from selectolax.lexbor import LexborHTMLParser
 from utils.basescraper import BaseScraper
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import html
 import logging
+import math
+import os
+import re
 
 
 class QualitEnrConfig:
@@ -32,10 +40,28 @@ class QualitEnrConfig:
     }
     REQUEST_DELAY = None  # Random delay between 1-3 seconds
     MAX_RETRIES = 3
+    RESULTS_PER_PAGE = 20
+    MAX_CONCURRENT_REQUESTS = 4  # In-flight requests per host, also the listing/detail worker count
+    CACHE_EXPIRE_AFTER = 7 * 24 * 60 * 60  # Keep cached company pages for a week
+    CACHE_URLS_EXPIRE_AFTER = {
+        '*/annuaire/page/*': 60 * 60,  # Listing pages expire quickly so new companies are picked up
+    }
     LOG_LEVEL = logging.INFO
     LOG_FILE = "qualit_enr_scraper.log"
 
 
+# Only the tags read by the BeautifulSoup fallback parser are built into the tree
+_DETAIL_STRAINER = SoupStrainer(["h1", "h2", "div"])
+
+# Listing pages are read straight from the raw bytes, BeautifulSoup is only used if these miss
+_COUNT_RE = re.compile(rb'id="company-search-results".*?/\s*(\d+)\s*r\xc3\xa9sultat', re.S)
+_RESULT_LINK_RE = re.compile(rb'<a\s[^>]*\bclass="(?:[^"]*\s)?results-item(?:\s[^"]*)?"[^>]*>')
+_HREF_RE = re.compile(rb'(?<![\w-])href="([^"]*)"')
+
+# The skills block is the div.cms following the "Nos compétences" heading, matched in one lexbor query
+_SKILLS_SELECTOR = 'h2:lexbor-contains("Nos compétences") ~ div.cms'
+
+
 class QualitEnrScraper(BaseScraper, QualitEnrConfig):
     def __init__(self):
         # Initialize with class variables
@@ -48,33 +74,46 @@ class QualitEnrScraper(BaseScraper, QualitEnrConfig):
             default_cookies=self.DEFAULT_COOKIES,
             request_delay=self.REQUEST_DELAY,
             max_retries=self.MAX_RETRIES,
+            max_concurrent_requests=self.MAX_CONCURRENT_REQUESTS,
+            cache_expire_after=self.CACHE_EXPIRE_AFTER,
+            cache_urls_expire_after=self.CACHE_URLS_EXPIRE_AFTER,
             log_level=self.LOG_LEVEL,
             log_file=self.LOG_FILE
         )
         self.output_file = f"data/qualit-enr_output.csv"
+        self._done = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> set:
+        """Get the (link, type) pairs already saved to the output file so a rerun can resume"""
+        if not os.path.exists(self.output_file):
+            return set()
+
+        with open(self.output_file, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            if not {'link', 'type'}.issubset(reader.fieldnames or []):
+                self.logger.error(
+                    f"Cannot resume from {self.output_file}: header {reader.fieldnames} has no link/type columns"
+                )
+                return set()
+            done = {(row['link'], row['type']) for row in reader}
+        self.logger.info(f"Resuming with {len(done)} companies already saved in {self.output_file}")
+        return done
 
     def _get_company_details(self, link: str, category: str) -> dict:
         """Get detailed information for a single company"""
         self.logger.info(f"Scraping company details from: {link}")
         response = self.make_request(link)
-        soup = self.get_soup(response.text)
 
         try:
-            name = soup.find("h1").get_text(strip=True)
-            addr = soup.find("div", "fs-lg lh-md").get_text("||", True)
-            addr_sp = addr.split("||")
-
-            street = addr_sp[0]
-            zip_city = addr_sp[-1]
-            zip_city_sp = zip_city.split(" ")
-            zip_code = zip_city_sp[0]
-            city = " ".join(zip_city_sp[1:])
+            try:
+                name, addr, phone, skills_name = self._parse_details(response)
+            except Exception as e:
+                self.logger.warning(f"Falling back to BeautifulSoup for {link}: {str(e)}")
+                name, addr, phone, skills_name = self._parse_details_soup(response)
 
-            skills = soup.find("h2", string="Nos compétences")
-            skills_name = skills.find_next_sibling("div", "cms").get_text("\n ", strip=True) if skills else ""
-
-            phone_container = soup.find("div", "phone-container d-none")
-            phone = phone_container.find("a").get_text(strip=True) if phone_container else ""
+            street = addr.partition("||")[0]
+            zip_city = addr.rpartition("||")[2]
+            zip_code, _, city = zip_city.partition(" ")
 
             return {
                 'link': link,
@@ -90,47 +129,139 @@ class QualitEnrScraper(BaseScraper, QualitEnrConfig):
             self.logger.error(f"Error parsing company details from {link}: {str(e)}")
             return {}
 
-    def scrape_region_category(self, category: str, region: str) -> list:
-        """Scrape all pages for a specific category and region"""
-        self.logger.info(f"Starting scrape for category: {category}, region: {region}")
-        all_results = []
-        page = 1
+    def _parse_details(self, response) -> tuple:
+        """Extract name, raw address, phone and skills from a company page with lexbor"""
+        tree = LexborHTMLParser(response.content)
+        name = tree.css_first("h1").text(strip=True)
+        addr = tree.css_first("div.fs-lg.lh-md").text(separator="||", strip=True, skip_empty=True)
+
+        skills_div = tree.css_first(_SKILLS_SELECTOR)
+        skills_name = skills_div.text(separator="\n ", strip=True, skip_empty=True) if skills_div is not None else ""
+
+        phone_link = tree.css_first("div.phone-container.d-none a")
+        phone = phone_link.text(strip=True) if phone_link is not None else ""
+
+        return name, addr, phone, skills_name
 
-        while True:
-            url = f"{self.BASE_URL}/annuaire/page/{page}/?type={category}&ville={region}&city&lat&lng&loc"
-            self.logger.info(f"Scraping page {page} for {category} in region {region}")
+    def _parse_details_soup(self, response) -> tuple:
+        """Extract name, raw address, phone and skills from a company page with BeautifulSoup"""
+        # Only trust the encoding when the server declared one, otherwise let lxml read the meta tag
+        encoding = response.encoding if "charset" in response.headers.get("Content-Type", "") else None
+        soup = self.get_soup(response.content, parse_only=_DETAIL_STRAINER, from_encoding=encoding)
 
-            response = self.make_request(url)
-            soup = self.get_soup(response.text)
+        name = soup.find("h1").get_text(strip=True)
+        addr = soup.find("div", "fs-lg lh-md").get_text("||", True)
 
-            total_pages = 1
-            if page == 1:
+        skills = soup.find("h2", string="Nos compétences")
+        skills_name = skills.find_next_sibling("div", "cms").get_text("\n ", strip=True) if skills else ""
+
+        phone_container = soup.find("div", "phone-container d-none")
+        phone = phone_container.find("a").get_text(strip=True) if phone_container else ""
+
+        return name, addr, phone, skills_name
+
+    def _fetch_listing(self, page: int, category: str, region: str, total_count: int = None) -> tuple:
+        """Get the company links of one listing page, plus the total result count (read from page 1)"""
+        url = f"{self.BASE_URL}/annuaire/page/{page}/?type={category}&ville={region}&city&lat&lng&loc"
+        self.logger.info(f"Scraping page {page} for {category} in region {region}")
+
+        response = self.make_request(url)
+        content = response.content
+
+        if page == 1:
+            match = _COUNT_RE.search(content)
+            if match:
+                total_count = int(match.group(1))
+
+        hrefs = []
+        for link_tag in _RESULT_LINK_RE.findall(content):
+            href = _HREF_RE.search(link_tag)
+            if href:
+                hrefs.append(html.unescape(href.group(1).decode()))
+
+        # Every page but the last is full, so a short page means the regex missed some links
+        expected = self._expected_listing_size(page, total_count)
+        count_missing = page == 1 and total_count is None
+        links_missing = len(hrefs) < expected if expected is not None else not hrefs
+        if count_missing:
+            self.logger.warning(
+                f"Regex could not read the result count on page {page} for {category} in region {region}, "
+                f"falling back to BeautifulSoup"
+            )
+        elif links_missing:
+            self.logger.warning(
+                f"Regex found {len(hrefs)} links (expected {expected}) on page {page} for {category} "
+                f"in region {region}, falling back to BeautifulSoup"
+            )
+        if count_missing or links_missing:
+            soup = self.get_soup(content)
+            if count_missing:
                 try:
                     count_text = soup.find(id="company-search-results").get_text(strip=True)
                     total_count = int(count_text.split("/")[1].replace(" résultat(s)", ""))
-                    total_pages = (total_count // 20) + 1
-                    self.logger.info(f"Found {total_count} results, estimated {total_pages} pages")
                 except Exception as e:
                     self.logger.warning(f"Could not determine total pages: {str(e)}")
+            soup_hrefs = [item.get("href") for item in soup.find_all("a", "results-item")]
+            if len(soup_hrefs) > len(hrefs):
+                hrefs = soup_hrefs
 
-            # Process company listings
-            items = soup.find_all("a", "results-item")
-            results = []
-            for item in items:
-                href = item.get("href")
-                company_data = self._get_company_details(href, category)
-                if company_data:
-                    results.append(company_data)
-                    self.save_to_csv([company_data], self.output_file)
+            expected = self._expected_listing_size(page, total_count)
+            if expected is not None and len(hrefs) < expected:
+                self.logger.warning(f"Page {page} for {category} in region {region} lists {len(hrefs)} of {expected} expected companies")
 
-            page_results, total_pages = results, total_pages
-            all_results.extend(page_results)
+        self.logger.info(f"Page {page} for {category} in region {region} - {len(hrefs)} companies listed")
+        return hrefs, total_count
 
-            self.logger.info(f"Page {page}/{total_pages} completed - {len(page_results)} companies found")
+    def _expected_listing_size(self, page: int, total_count: int = None):
+        """Get how many companies a listing page should hold, or None if the total is unknown"""
+        if total_count is None:
+            return None
+        return min(self.RESULTS_PER_PAGE, max(total_count - (page - 1) * self.RESULTS_PER_PAGE, 0))
 
-            if page >= total_pages:
-                break
-            page += 1
+    def scrape_region_category(self, category: str, region: str) -> list:
+        """Scrape all pages for a specific category and region"""
+        self.logger.info(f"Starting scrape for category: {category}, region: {region}")
+
+        # Page 1 gives the result count, the remaining listing pages are then fetched together
+        hrefs, total_count = self._fetch_listing(1, category, region)
+        total_pages = math.ceil(total_count / self.RESULTS_PER_PAGE) if total_count else 1
+        self.logger.info(f"Found {total_count} results, {total_pages} pages")
+
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS) as executor:
+                listings = {
+                    executor.submit(self._fetch_listing, page, category, region, total_count): page
+                    for page in range(2, total_pages + 1)
+                }
+                for future, page in listings.items():
+                    try:
+                        hrefs.extend(future.result()[0])
+                    except Exception as e:
+                        self.logger.error(f"Failed to scrape page {page} for {category} in region {region}: {str(e)}")
+
+        # A company listed under several categories gets one row per category
+        pending = [href for href in dict.fromkeys(hrefs) if (href, category) not in self._done]
+        if len(pending) < len(hrefs):
+            self.logger.info(f"Skipping {len(hrefs) - len(pending)} companies already scraped")
+
+        all_results = []
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS) as executor:
+            futures = {executor.submit(self._get_company_details, href, category): href for href in pending}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        company_data = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Failed to scrape company details from {futures[future]}: {str(e)}")
+                        continue
+                    if company_data:
+                        all_results.append(company_data)
+                        self.append_csv_row(company_data, self.output_file)
+                        self._done.add((company_data['link'], category))
+            except BaseException:
+                # Don't send the queued requests when the scrape is aborting, e.g. on a CSV write error
+                executor.shutdown(cancel_futures=True)
+                raise
 
         self.logger.info(f"Completed scrape for {category}/{region} - {len(all_results)} total companies")
         return all_results
@@ -147,5 +278,6 @@ if __name__ == '__main__':
         for category in categories_urls:
             region_data = scraper.scrape_region_category(category, region)
             all_data.extend(region_data)
+    scraper.close_csv_files()
     stats = scraper.get_request_stats()
     print(f"Scraping completed. Statistics:\n{stats}")
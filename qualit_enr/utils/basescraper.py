@@ -1,21 +1,37 @@
+import atexit
 import csv
-import inspect
 import json
 import logging
 import os
+import queue
 import random
 import re
+import sys
+import threading
 import time
+from collections import defaultdict
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Union, TextIO
 from urllib.parse import urljoin, urlparse, parse_qs
 
 import requests
-from bs4 import BeautifulSoup
+import requests_cache
+from bs4 import BeautifulSoup, SoupStrainer
 from curl_cffi import requests as curl_requests
 from requests import Session
-from retry import retry
+from requests.adapters import HTTPAdapter
 from slugify import slugify
+from urllib3.util import Retry
+
+_WS_RE = re.compile(r'\s+')
+_PHONE_RE = re.compile(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Queued CSV rows are written in batches of up to this many rows, or whatever arrived within the timeout
+_CSV_BATCH_SIZE = 50
+_CSV_BATCH_TIMEOUT = 1.0
+_CSV_STOP = object()
 
 
 class BaseScraper:
@@ -42,6 +58,9 @@ class BaseScraper:
             default_cookies: Optional[Dict] = None,
             request_delay: Optional[Tuple[float, float]] = (1.0, 3.0),
             max_retries: int = 3,
+            max_concurrent_requests: Optional[int] = None,
+            cache_expire_after: Optional[int] = None,
+            cache_urls_expire_after: Optional[Dict[str, int]] = None,
             log_level: int = logging.INFO,
             log_file: Optional[str] = None
     ):
@@ -54,20 +73,48 @@ class BaseScraper:
             use_curl: Whether to use curl_cffi for requests
             default_headers: Default headers to use for requests
             default_cookies: Default cookies to use for requests
-            request_delay: Min/max delay between requests in seconds
+            request_delay: Min/max delay between requests to the same host in seconds
             max_retries: Maximum number of retry attempts for failed requests
+            max_concurrent_requests: Cap on in-flight requests per host, shared by all threads
+            cache_expire_after: Seconds to keep GET responses in the on-disk cache (disabled if None)
+            cache_urls_expire_after: Per-URL-pattern overrides of cache_expire_after, in seconds
             log_level: Logging level (e.g., logging.INFO, logging.DEBUG)
             log_file: Optional file path to save logs
         """
         self.site_name = site_name
         self.base_url = base_url.rstrip('/') if base_url else None
         self.use_curl = use_curl
-        self.session = Session()
+        if cache_expire_after and not use_curl:
+            os.makedirs('.cache', exist_ok=True)
+            self.session = requests_cache.CachedSession(
+                cache_name=os.path.join('.cache', f"{site_name}_cache"),
+                backend='sqlite',
+                expire_after=cache_expire_after,
+                urls_expire_after=cache_urls_expire_after,
+                allowable_methods=('GET',),
+                stale_if_error=True
+            )
+        else:
+            self.session = Session()
+        self.curl_session = None
         self.default_headers = default_headers or {}
         self.default_cookies = default_cookies or {}
         self.request_delay = request_delay
         self.max_retries = max_retries
         self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._last_hit: Dict[str, float] = {}
+        self._host_locks = defaultdict(threading.Lock)
+        self.max_concurrent_requests = max_concurrent_requests
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        self._csv_writers: Dict[str, Tuple[TextIO, csv.DictWriter]] = {}
+        self._csv_headers: Dict[str, Optional[List[str]]] = {}
+        self._csv_lock = threading.Lock()
+        self._write_q: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._csv_error: Optional[Exception] = None
+        atexit.register(self.close_csv_files)
 
         # Configure logging
         self.logger = logging.getLogger(f"{self.__class__.__name__}_{self.site_name}")
@@ -97,27 +144,88 @@ class BaseScraper:
                 'Accept-Language': 'en-US,en;q=0.5',
             })
 
+        # Keep-alive connection pool shared by all requests to the same host, retries happen inside the pool
+        retry_config = Retry(
+            total=self.max_retries,
+            backoff_factor=1.0,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry_config)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.default_headers)
+        self.session.cookies.update(self.default_cookies)
+
+        if self.use_curl:
+            self.curl_session = curl_requests.Session(
+                headers=self.default_headers,
+                cookies=self.default_cookies,
+                impersonate="chrome124",
+                retry=self.max_retries
+            )
+
         self.logger.info(f"Initialized scraper for {self.site_name} with base URL: {self.base_url}")
 
-    def _random_delay(self):
-        """Sleep for a random time between the configured min/max delay."""
-        if self.request_delay and self.request_delay[1] > 0:
+    def _request_slot(self, url: str):
+        """Get the semaphore bounding in-flight requests to the URL's host, or a no-op if uncapped."""
+        if not self.max_concurrent_requests:
+            return nullcontext()
+
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_concurrent_requests)
+            return self._host_slots[host]
+
+    def _has_fresh_cache(
+            self,
+            method: str,
+            url: str,
+            headers: Optional[Dict],
+            cookies: Optional[Dict],
+            params: Optional[Dict],
+            data: Optional[Dict],
+            json_data: Optional[Dict]
+    ) -> bool:
+        """Check whether the response cache holds an unexpired response for this request."""
+        if self.use_curl or not isinstance(self.session, requests_cache.CachedSession):
+            return False
+
+        request = self.session.prepare_request(requests.Request(
+            method, url, headers=headers, cookies=cookies, params=params, data=data, json=json_data
+        ))
+        cached = self.session.cache.get_response(self.session.cache.create_key(request))
+        return cached is not None and not cached.is_expired
+
+    def _wait_for_host(self, url: str):
+        """Sleep until a random min/max delay has passed since the last request to the same host."""
+        if not (self.request_delay and self.request_delay[1] > 0):
+            return
+
+        host = urlparse(url).netloc
+        with self._host_locks[host]:
             delay = random.uniform(*self.request_delay)
-            self.logger.info(f"Sleeping for {delay:.2f} seconds")
-            time.sleep(delay)
+            wait = delay - (time.monotonic() - self._last_hit.get(host, float('-inf')))
+            if wait > 0:
+                self.logger.info(f"Sleeping for {wait:.2f} seconds before next request to {host}")
+                time.sleep(wait)
+            self._last_hit[host] = time.monotonic()
 
-    def _log_request(self, url: str, method: str, attempt: int):
+    def _log_request(self, url: str, method: str):
         """Log request details."""
-        caller_frame = inspect.currentframe().f_back.f_back
-        caller_info = inspect.getframeinfo(caller_frame)
-        caller_name = caller_info.function
+        # Frame lookups are skipped entirely unless the debug record would be emitted
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
 
+        caller_frame = sys._getframe(2)
         self.logger.debug(
-            f"Making {method} request to {url} (attempt {attempt}) "
-            f"called from {caller_name} at line {caller_info.lineno}"
+            "Making %s request to %s called from %s at line %d",
+            method, url, caller_frame.f_code.co_name, caller_frame.f_lineno
         )
 
-    @retry(tries=3, delay=1, backoff=2, logger=None)
     def make_request(
             self,
             url: str,
@@ -129,10 +237,11 @@ class BaseScraper:
             json_data: Optional[Dict] = None,
             allow_redirects: bool = True,
             timeout: int = 100,
+            refresh: bool = False,
             **kwargs
     ) -> requests.Response:
         """
-        Make an HTTP request with retry logic and random delays.
+        Make an HTTP request with retry logic and per-host rate limiting.
 
         Args:
             url: URL to request
@@ -144,6 +253,7 @@ class BaseScraper:
             json_data: JSON payload
             allow_redirects: Whether to follow redirects
             timeout: Request timeout in seconds
+            refresh: Ignore any cached response for this request and cache the fresh one
             **kwargs: Additional arguments for requests
 
         Returns:
@@ -152,90 +262,102 @@ class BaseScraper:
         Raises:
             requests.exceptions.RequestException: If the request fails after all retries
         """
-        self._random_delay()
-        self.request_count += 1
-
-        # Get the current attempt number, defaulting to 1 if not set
-        attempt = kwargs.pop('_attempt', 1)
-
-        merged_headers = {**self.default_headers, **(headers or {})}
-        merged_cookies = {**self.default_cookies, **(cookies or {})}
+        with self._count_lock:
+            self.request_count += 1
+            request_number = self.request_count
 
         if not url.startswith(('http://', 'https://')) and self.base_url:
             url = urljoin(self.base_url, url)
 
-        self._log_request(url, method, attempt)
+        if refresh and not self.use_curl and isinstance(self.session, requests_cache.CachedSession):
+            kwargs['force_refresh'] = True
+
+        # Fresh cache hits never reach the site, so they skip the politeness delay and request slot
+        from_cache = not refresh and self._has_fresh_cache(method, url, headers, cookies, params, data, json_data)
+        if not from_cache:
+            self._wait_for_host(url)
+        self._log_request(url, method)
 
         try:
-            start_time = time.time()
-
-            if self.use_curl:
-                response = curl_requests.request(
-                    method,
-                    url,
-                    headers=merged_headers,
-                    cookies=merged_cookies,
-                    params=params,
-                    data=data,
-                    json=json_data,
-                    allow_redirects=allow_redirects,
-                    timeout=timeout,
-                    impersonate="chrome124",
-                    **kwargs
-                )
-            else:
-                response = self.session.request(
-                    method,
-                    url,
-                    headers=merged_headers,
-                    cookies=merged_cookies,
-                    params=params,
-                    data=data,
-                    json=json_data,
-                    allow_redirects=allow_redirects,
-                    timeout=timeout,
-                    **kwargs
-                )
+            # Bound the number of requests in flight to this host across all worker threads
+            with nullcontext() if from_cache else self._request_slot(url):
+                start_time = time.time()
+                if self.use_curl:
+                    response = self.curl_session.request(
+                        method,
+                        url,
+                        headers=headers,
+                        cookies=cookies,
+                        params=params,
+                        data=data,
+                        json=json_data,
+                        allow_redirects=allow_redirects,
+                        timeout=timeout,
+                        **kwargs
+                    )
+                else:
+                    response = self.session.request(
+                        method,
+                        url,
+                        headers=headers,
+                        cookies=cookies,
+                        params=params,
+                        data=data,
+                        json=json_data,
+                        allow_redirects=allow_redirects,
+                        timeout=timeout,
+                        **kwargs
+                    )
 
             elapsed = time.time() - start_time
+            # Content-Length avoids touching the body just to log its size
             self.logger.info(
-                f"Request #{self.request_count} to {url} completed in {elapsed:.2f}s - "
-                f"Status: {response.status_code} - Size: {len(response.content)} bytes"
+                "Request #%d to %s completed in %.2fs - Status: %d - Size: %s bytes",
+                request_number, url, elapsed, response.status_code,
+                response.headers.get('Content-Length') or '?'
             )
 
-            response.raise_for_status()
+            if response.status_code >= 400:
+                response.raise_for_status()
+            # Fix the encoding once so later .text accesses skip charset detection
+            if not response.encoding:
+                response.encoding = 'utf-8'
             return response
 
         except requests.exceptions.RequestException as e:
             self.logger.error(
-                f"Request failed (attempt {attempt}): {str(e)} - URL: {url}",
+                f"Request failed: {str(e)} - URL: {url}",
                 exc_info=self.logger.level <= logging.DEBUG
             )
-
-            # If we're going to retry, increment the attempt number
-            if attempt < self.max_retries:
-                kwargs['_attempt'] = attempt + 1
             raise
         except Exception as e:
             self.logger.error(
-                f"Unexpected error during request (attempt {attempt}): {str(e)} - URL: {url}",
+                f"Unexpected error during request: {str(e)} - URL: {url}",
                 exc_info=self.logger.level <= logging.DEBUG
             )
             raise requests.exceptions.RequestException(f"Unexpected error: {str(e)}")
 
-    def get_soup(self, html_content: str, parser: str = 'lxml') -> BeautifulSoup:
+    def get_soup(
+            self,
+            html_content: Union[str, bytes],
+            parser: str = 'lxml',
+            parse_only: Optional[SoupStrainer] = None,
+            from_encoding: Optional[str] = None
+    ) -> BeautifulSoup:
         """
         Parse HTML content with BeautifulSoup.
 
         Args:
-            html_content: HTML string to parse
+            html_content: HTML string or raw bytes to parse
             parser: Parser to use (lxml, html.parser, etc.)
+            parse_only: Optional SoupStrainer restricting which tags are built
+            from_encoding: Known encoding of byte content, skips detection
 
         Returns:
             BeautifulSoup object
         """
         self.logger.debug(f"Parsing HTML content with {parser} parser")
-        return BeautifulSoup(html_content, parser)
+        return BeautifulSoup(html_content, parser, parse_only=parse_only, from_encoding=from_encoding)
 
     from typing import List, Union, Dict, Optional
 
@@ -256,7 +378,7 @@ class BaseScraper:
             mode: File mode ('w' for write, 'a' for append)
 
         Raises:
-            ValueError: If data format is invalid
+            ValueError: If data format is invalid or an existing file has a different header
         """
         try:
             if not data:
@@ -276,68 +398,179 @@ class BaseScraper:
                 if not fieldnames:
                     raise ValueError("Fieldnames required for list data")
 
-            header_needed = True
-            file_exists = os.path.isfile(filename)
-            write_mode = mode
-
-            # Check if we need to add headers when appending
-            if mode == 'a' and file_exists:
-                # Check if file is empty
-                if os.path.getsize(filename) > 0:
-                    try:
-                        with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
-                            reader = csv.reader(f)
-                            existing_header = next(reader, None)
-
-                            # If the header exists and matches our fieldnames, no header needed
-                            if existing_header and existing_header == fieldnames:
-                                header_needed = False
-                            # If the header doesn't match or doesn't exist, we need to rewrite the file
-                            else:
-                                # Read all existing data
-                                f.seek(0)  # Go back to beginning of file
-                                existing_data = list(reader)
-
-                                # If there was a mismatched header, we need to preserve it as data
-                                if existing_header and existing_header != fieldnames:
-                                    existing_data.insert(0, existing_header)
-
-                                # We'll rewrite the file with the correct header
-                                write_mode = 'w'
-
-                                # After writing the header, we'll add all existing data first
-                                temp_data = existing_data.copy()
-                                temp_data.extend(data)
-                                data = temp_data
-                    except Exception as e:
-                        self.logger.warning(f"Error checking existing CSV header: {str(e)}")
-                        # Default to adding header if there's an issue reading the file
-                        header_needed = True
-                        write_mode = 'w'
-                else:
-                    # File exists but is empty, we need a header
-                    header_needed = True
+            # Appending to an existing file must match its header, it is never rewritten
+            header_needed = mode == 'w' or self._csv_header_needed(filename, fieldnames)
 
             # Open file for append/write
-            with open(filename, write_mode, encoding='utf-8-sig', newline='') as f:
+            with open(filename, mode, encoding='utf-8-sig', newline='') as f:
                 if isinstance(data[0], dict):
                     writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    if write_mode == 'w' or header_needed:
+                    if header_needed:
                         writer.writeheader()
                     writer.writerows(data)
                 elif isinstance(data[0], (list, tuple)):
                     writer = csv.writer(f)
-                    if (write_mode == 'w' or header_needed) and fieldnames:
+                    if header_needed and fieldnames:
                         writer.writerow(fieldnames)
                     writer.writerows(data)
                 else:
                     raise ValueError("Data must be a list of dictionaries or lists")
 
+            self._csv_headers[filename] = fieldnames
             self.logger.debug(f"Successfully saved data to {filename}")
         except Exception as e:
             self.logger.error(f"Failed to save CSV file {filename}: {str(e)}")
             raise
 
+    def _csv_header_needed(self, filename: str, fieldnames: Optional[List[str]]) -> bool:
+        """
+        Check the header of a CSV file before appending to it.
+        Each file is only read the first time, later checks use the cached header.
+
+        Args:
+            filename: Output file path
+            fieldnames: Column names the caller is about to write
+
+        Returns:
+            True if the file is missing or empty and needs a header row
+
+        Raises:
+            ValueError: If an existing file has a different header
+        """
+        if filename in self._csv_headers and self._csv_headers[filename] == fieldnames:
+            return False
+
+        if not os.path.isfile(filename) or os.path.getsize(filename) == 0:
+            return True
+
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+            existing_header = next(csv.reader(f), None)
+        if fieldnames and existing_header != fieldnames:
+            raise ValueError(f"CSV header mismatch in {filename}: {existing_header} != {fieldnames}")
+
+        self._csv_headers[filename] = fieldnames
+        return False
+
+    def _get_csv_writer(self, filename: str, fieldnames: List[str]) -> Tuple[TextIO, csv.DictWriter]:
+        """
+        Open a CSV file for appending once and reuse its writer for later rows.
+
+        Args:
+            filename: Output file path
+            fieldnames: Column names, written as header if the file is new
+
+        Returns:
+            Tuple of the open file handle and its DictWriter
+
+        Raises:
+            ValueError: If an existing file has a different header
+        """
+        if filename in self._csv_writers:
+            return self._csv_writers[filename]
+
+        header_needed = self._csv_header_needed(filename, fieldnames)
+        f = open(filename, 'a', encoding='utf-8-sig', newline='')
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if header_needed:
+            writer.writeheader()
+        self._csv_writers[filename] = (f, writer)
+        self._csv_headers[filename] = fieldnames
+        self.logger.debug(f"Opened CSV file for appending: {filename}")
+        return f, writer
+
+    def append_csv_row(self, row: Dict, filename: str) -> None:
+        """
+        Queue a single row to be appended to a CSV file by the background writer thread.
+
+        Args:
+            row: Row data keyed by column name
+            filename: Output file path
+
+        Raises:
+            Exception: The first error hit by the writer thread, once it has stopped
+        """
+        if self._csv_error is not None:
+            raise self._csv_error
+
+        with self._csv_lock:
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(
+                    target=self._csv_writer_loop, name=f"{self.site_name}-csv-writer", daemon=True
+                )
+                self._writer_thread.start()
+        self._write_q.put((filename, row))
+
+    def _csv_writer_loop(self) -> None:
+        """Drain queued rows in batches until close_csv_files sends the stop marker or a write fails."""
+        stop = False
+        while not stop and self._csv_error is None:
+            item = self._write_q.get()
+            if item is _CSV_STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + _CSV_BATCH_TIMEOUT
+            while len(batch) < _CSV_BATCH_SIZE:
+                try:
+                    item = self._write_q.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _CSV_STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write_csv_batch(batch)
+
+    def _write_csv_batch(self, batch: List[Tuple[str, Dict]]) -> None:
+        """
+        Write a batch of queued rows, one writerows call and flush per file.
+
+        Args:
+            batch: List of (filename, row) tuples in queue order
+        """
+        rows_by_file: Dict[str, List[Dict]] = {}
+        for filename, row in batch:
+            rows_by_file.setdefault(filename, []).append(row)
+
+        for filename, rows in rows_by_file.items():
+            try:
+                f, writer = self._get_csv_writer(filename, list(rows[0].keys()))
+                writer.writerows(rows)
+                f.flush()
+                self.logger.debug(f"Appended {len(rows)} rows to {filename}")
+            except Exception as e:
+                self.logger.error(f"Failed to append {len(rows)} rows to CSV file {filename}: {str(e)}")
+                self._csv_error = e
+                return
+
+    def close_csv_files(self) -> None:
+        """
+        Write any queued rows and close all CSV files opened by append_csv_row.
+
+        Raises:
+            Exception: The first error hit by the writer thread, if any
+        """
+        with self._csv_lock:
+            writer_thread, self._writer_thread = self._writer_thread, None
+        if writer_thread is not None:
+            self._write_q.put(_CSV_STOP)
+            writer_thread.join()
+
+        for f, _ in self._csv_writers.values():
+            f.close()
+        self._csv_writers.clear()
+
+        error, self._csv_error = self._csv_error, None
+        if error is not None:
+            # Rows queued after the failure were never written, drop them so a new writer starts clean
+            while True:
+                try:
+                    self._write_q.get_nowait()
+                except queue.Empty:
+                    break
+            raise error
+
     def save_to_json(
             self,
             data: Union[Dict, List],
@@ -484,8 +717,7 @@ class BaseScraper:
         Returns:
             List of found phone numbers
         """
-        phone_regex = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-        numbers = re.findall(phone_regex, text)
+        numbers = _PHONE_RE.findall(text)
         self.logger.debug(f"Extracted {len(numbers)} phone numbers from text")
         return numbers
 
@@ -499,8 +731,7 @@ class BaseScraper:
         Returns:
             List of found email addresses
         """
-        email_regex = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        emails = re.findall(email_regex, text)
+        emails = _EMAIL_RE.findall(text)
         self.logger.debug(f"Extracted {len(emails)} emails from text")
         return emails
 
@@ -520,7 +751,7 @@ class BaseScraper:
             return ''
 
         # Replace multiple spaces with single space
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
 
         if not preserve_newlines:
             # Replace newlines with spaces